@@ -3,24 +3,106 @@ Prophet-based Demand Forecasting Module for Retail Workforce Management
 Uses Facebook Prophet for time series forecasting with retail-specific patterns
 """
 
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import NormalDist
 import numpy as np
 import pandas as pd
 from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
 from datetime import datetime, timedelta
 import json
-import random
+import orjson
 from typing import Dict, List, Any, Optional, Tuple
-import plotly.graph_objs as go
+import plotly.io as pio
 from plotly.utils import PlotlyJSONEncoder
 
+# Opt-in closed-form predict for MAP-fitted linear models; its interval covers observation noise only,
+# not Prophet's simulated trend uncertainty, so intervals (and the staff bands) come out narrower
+FAST_PREDICT = os.getenv('PROPHET_FAST_PREDICT', '').lower() in ('1', 'true', 'yes')
+FAST_PREDICT_CHECK_COLUMNS = ['yhat', 'trend', 'weekly', 'yearly']
+
+# Process pool for parallel department fits, see get_fit_pool()
+fit_pool = None
+fit_pool_lock = threading.Lock()
+
+# Shared generator for simulated data; methods take an optional rng for reproducible runs
+simulation_rng = np.random.default_rng()
+
+# Share of daily customers arriving in each hour, by department
+HOURLY_PATTERNS = {name: np.array(pattern) for name, pattern in {
+    'default': [
+        0.02, 0.01, 0.01, 0.01, 0.02, 0.03,  # 12am-6am
+        0.04, 0.05, 0.07, 0.09, 0.11, 0.12,  # 6am-12pm
+        0.10, 0.09, 0.08, 0.07, 0.06, 0.05,  # 12pm-6pm
+        0.04, 0.03, 0.02, 0.01, 0.01, 0.01   # 6pm-12am
+    ],
+    'Grocery': [
+        0.01, 0.01, 0.01, 0.01, 0.02, 0.03,  # Early morning
+        0.05, 0.07, 0.09, 0.10, 0.11, 0.10,  # Morning rush
+        0.09, 0.08, 0.07, 0.06, 0.08, 0.09,  # Afternoon/evening
+        0.07, 0.05, 0.03, 0.02, 0.01, 0.01   # Late evening
+    ],
+    'Electronics': [
+        0.01, 0.01, 0.01, 0.01, 0.01, 0.02,  # Night
+        0.03, 0.04, 0.05, 0.07, 0.09, 0.11,  # Morning
+        0.12, 0.11, 0.10, 0.09, 0.08, 0.07,  # Afternoon/evening
+        0.06, 0.04, 0.02, 0.01, 0.01, 0.01   # Late night
+    ]
+}.items()}
+HOUR_LABELS = [f"{hour:02d}:00" for hour in range(24)]
+
+# Forecast columns kept after prediction and their compact dtypes; other Prophet components are dropped
+FORECAST_COLUMNS = {
+    'ds': None,
+    'trend': np.float32,
+    'yhat_lower': np.float32,
+    'yhat_upper': np.float32,
+    'yhat': np.float32,
+    'weekly': np.float32,
+    'yearly': np.float32,
+    'department': None,
+    'required_staff': np.int16,
+    'required_staff_lower': np.int16,
+    'required_staff_upper': np.int16
+}
+
+# plotly_white template expanded once; Plotly.js expects it inline in the figure layout
+PLOT_TEMPLATE = json.loads(json.dumps(pio.templates['plotly_white'], cls=PlotlyJSONEncoder))
+
+# Day names and demand pattern by day of week (Mon=0, Sun=6)
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DOW_MULTIPLIERS = np.array([0.7, 0.75, 0.8, 0.85, 1.2, 1.5, 1.1])
+
+
 class RetailDemandForecaster:
     """
     Advanced demand forecasting using Prophet with retail-specific patterns
     """
     
+    # Prophet settings shared by every department model
+    MODEL_PARAMS = {
+        'yearly_seasonality': True,
+        'weekly_seasonality': True,
+        'daily_seasonality': False,
+        'seasonality_mode': 'multiplicative',  # Better for retail
+        'changepoint_prior_scale': 0.05,  # More flexible trend
+        'seasonality_prior_scale': 10,  # Strong seasonality
+        'holidays_prior_scale': 20,  # Strong holiday effects
+        'interval_width': 0.95
+    }
+    SEASONALITIES = [
+        {'name': 'monthly', 'period': 30.5, 'fourier_order': 5},
+        {'name': 'biweekly_payday', 'period': 14, 'fourier_order': 3}  # Payday effects (1st and 15th of month)
+    ]
+    
     def __init__(self):
         self.models = {}  # Store models per department
+        self.future_frames = {}  # (department, periods, include_history) -> (model, future frame, fast predict inputs)
         self.historical_data = None
+        self.history_by_department = {}  # Department -> its (ds, y) training frame
         self.forecast_results = {}
         self.department_multipliers = {
             'Sales Floor': 1.2,
@@ -35,14 +117,18 @@ class RetailDemandForecaster:
         
     def generate_historical_data(self, 
                                 days_back: int = 365, 
-                                departments: List[str] = None) -> pd.DataFrame:
+                                departments: List[str] = None,
+                                rng: np.random.Generator = None) -> pd.DataFrame:
         """
         Generate realistic historical retail data for Prophet training
         """
         if departments is None:
             departments = list(self.department_multipliers.keys())
+        if rng is None:
+            rng = simulation_rng
         
         data_frames = []
+        self.history_by_department = {}
         base_date = datetime.now() - timedelta(days=days_back)
         
         for dept in departments:
@@ -52,59 +138,60 @@ class RetailDemandForecaster:
             # Create base pattern
             base_customers = 150 * dept_multiplier
             
-            data = []
-            for date in dates:
-                # Day of week pattern (Mon=0, Sun=6)
-                dow_multipliers = [0.7, 0.75, 0.8, 0.85, 1.2, 1.5, 1.1]
-                dow_mult = dow_multipliers[date.dayofweek]
-                
-                # Monthly seasonality
-                month_mult = 1.0
-                if date.month in [11, 12]:  # Holiday season
-                    month_mult = 1.4
-                elif date.month in [6, 7, 8]:  # Summer
-                    month_mult = 1.15
-                elif date.month in [1, 2]:  # Post-holiday slow period
-                    month_mult = 0.85
-                
-                # Special events
-                event_mult = 1.0
-                if date.month == 11 and 22 <= date.day <= 28:  # Black Friday week
-                    event_mult = 2.0
-                elif date.month == 12 and 15 <= date.day <= 24:  # Pre-Christmas
-                    event_mult = 1.8
-                elif date.day == 1:  # First of month (payday effect)
-                    event_mult = 1.2
-                elif date.day == 15:  # Mid-month payday
-                    event_mult = 1.15
-                
-                # Weather impact (simulated)
-                weather_impact = random.uniform(0.9, 1.1)
-                
-                # Calculate final customer count with some randomness
-                customers = (base_customers * dow_mult * month_mult * 
-                           event_mult * weather_impact * 
-                           random.uniform(0.85, 1.15))
-                
-                # Add trend component (slight growth over time)
-                days_since_start = (date - base_date).days
-                trend = 1 + (days_since_start / 365) * 0.05  # 5% annual growth
-                customers *= trend
-                
-                data.append({
-                    'ds': date,
-                    'y': int(customers),
-                    'department': dept,
-                    'day_of_week': date.strftime('%A'),
-                    'is_weekend': date.dayofweek >= 5,
-                    'is_holiday': event_mult > 1.5,
-                    'month': date.month
-                })
+            n = len(dates)
+            dow = dates.dayofweek.values
+            month = dates.month.values
+            day = dates.day.values
+            
+            black_friday_week = (month == 11) & (day >= 22) & (day <= 28)
+            pre_christmas = (month == 12) & (day >= 15) & (day <= 24)
+            
+            # Weather impact (simulated) and some randomness
+            weather_impact = rng.uniform(0.9, 1.1, n)
+            noise = rng.uniform(0.85, 1.15, n)
+            
+            dow_mult = DOW_MULTIPLIERS[dow]
+            
+            # Monthly seasonality: holiday season, summer, post-holiday slow period
+            month_mult = np.select(
+                [np.isin(month, [11, 12]), np.isin(month, [6, 7, 8]), np.isin(month, [1, 2])],
+                [1.4, 1.15, 0.85],
+                default=1.0
+            )
             
-            dept_df = pd.DataFrame(data)
+            # Special events: Black Friday week, pre-Christmas, paydays on the 1st and 15th
+            event_mult = np.select(
+                [black_friday_week, pre_christmas, day == 1, day == 15],
+                [2.0, 1.8, 1.2, 1.15],
+                default=1.0
+            )
+            
+            # Add trend component (slight growth over time): 5% annual growth
+            trend = 1 + (np.arange(n) / 365) * 0.05
+            
+            customers = (base_customers * dow_mult * month_mult *
+                         event_mult * weather_impact * noise * trend).astype(np.int64)
+            
+            dept_df = pd.DataFrame({
+                'ds': dates,
+                'y': customers,
+                'department': dept,
+                'day_of_week': dates.day_name(),
+                'is_weekend': dow >= 5,
+                'is_holiday': black_friday_week | pre_christmas,
+                'month': month
+            })
             data_frames.append(dept_df)
+            self.history_by_department[dept] = pd.DataFrame({'ds': dates, 'y': customers})
+        
+        historical_data = pd.concat(data_frames, ignore_index=True)
+        
+        # Low-cardinality columns as categoricals / narrow ints; categories are applied after concat so they match
+        historical_data['department'] = historical_data['department'].astype(pd.CategoricalDtype(departments))
+        historical_data['day_of_week'] = historical_data['day_of_week'].astype(pd.CategoricalDtype(DAY_NAMES, ordered=True))
+        historical_data['month'] = historical_data['month'].astype(np.int8)
         
-        self.historical_data = pd.concat(data_frames, ignore_index=True)
+        self.historical_data = historical_data
         return self.historical_data
     
     def add_retail_holidays(self, model: Prophet) -> Prophet:
@@ -151,39 +238,20 @@ class RetailDemandForecaster:
         """
         Train a Prophet model for a specific department
         """
-        # Filter data for department
-        dept_data = self.historical_data[
-            self.historical_data['department'] == department
-        ][['ds', 'y']].copy()
+        # Department's training data, split out when the history was generated
+        dept_data = self.history_by_department.get(department)
+        if dept_data is None:
+            raise ValueError(f"No historical data for department {department}")
         
         # Initialize Prophet with retail-specific parameters
-        model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=True,
-            daily_seasonality=False,
-            seasonality_mode='multiplicative',  # Better for retail
-            changepoint_prior_scale=0.05,  # More flexible trend
-            seasonality_prior_scale=10,  # Strong seasonality
-            holidays_prior_scale=20,  # Strong holiday effects
-            interval_width=0.95
-        )
+        model = Prophet(**self.MODEL_PARAMS)
         
         # Add holidays
         model = self.add_retail_holidays(model)
         
         # Add custom seasonalities
-        model.add_seasonality(
-            name='monthly',
-            period=30.5,
-            fourier_order=5
-        )
-        
-        # Add payday effects (1st and 15th of month)
-        model.add_seasonality(
-            name='biweekly_payday',
-            period=14,
-            fourier_order=3
-        )
+        for seasonality in self.SEASONALITIES:
+            model.add_seasonality(**seasonality)
         
         # Fit the model
         model.fit(dept_data)
@@ -208,36 +276,110 @@ class RetailDemandForecaster:
         
         model = self.models[department]
         
-        # Create future dataframe
-        future = model.make_future_dataframe(
-            periods=periods,
-            include_history=include_history
-        )
+        # Create future dataframe, reused until the department's model changes
+        key = (department, periods, include_history)
+        cached_model, future, fast_inputs = self.future_frames.get(key, (None, None, None))
+        if cached_model is not model:
+            future = model.make_future_dataframe(
+                periods=periods,
+                include_history=include_history
+            )
+            fast_inputs = self._prepare_fast_predict(model, future) if FAST_PREDICT else None
+            self.future_frames[key] = (model, future, fast_inputs)
         
         # Generate forecast
-        forecast = model.predict(future)
+        forecast = self._fast_predict(fast_inputs) if fast_inputs is not None else model.predict(future)
         
         # Add department info
         forecast['department'] = department
         
-        # Calculate staffing requirements (1 staff per 25 customers)
-        forecast['required_staff'] = np.maximum(
-            1,
-            np.ceil(forecast['yhat'] / 25)
-        )
+        # Calculate staffing requirements (1 staff per 25 customers) with ceil-division: -(-x // 25)
+        yhat, yhat_lower, yhat_upper = forecast[['yhat', 'yhat_lower', 'yhat_upper']].to_numpy().T
+        forecast['required_staff'] = np.maximum(-(-yhat // 25), 1).astype(np.int16)
         
         # Add confidence bands for staffing
-        forecast['required_staff_lower'] = np.maximum(
-            1,
-            np.ceil(forecast['yhat_lower'] / 25)
-        )
-        forecast['required_staff_upper'] = np.ceil(forecast['yhat_upper'] / 25)
+        forecast['required_staff_lower'] = np.maximum(-(-yhat_lower // 25), 1).astype(np.int16)
+        forecast['required_staff_upper'] = (-(-yhat_upper // 25)).astype(np.int16)
+        
+        # Keep only the columns the dashboards read, downcast for smaller later scans
+        forecast = forecast[[column for column in FORECAST_COLUMNS if column in forecast.columns]].astype({
+            column: dtype for column, dtype in FORECAST_COLUMNS.items()
+            if dtype is not None and column in forecast.columns
+        })
         
         # Store results
         self.forecast_results[department] = forecast
         
         return forecast
     
+    def _prepare_fast_predict(self, model: Prophet, future: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        Precompute the trend and seasonal feature matrix of a MAP-fitted linear model over future;
+        None when the model needs Prophet's own predict
+        """
+        if model.mcmc_samples > 0 or model.growth != 'linear':
+            return None
+        
+        df = model.setup_dataframe(future.copy())
+        params = {name: np.asarray(value) for name, value in model.params.items()}
+        trend = model.piecewise_linear(
+            df['t'].to_numpy(),
+            params['delta'].mean(axis=0),
+            float(params['k'].mean()),
+            float(params['m'].mean()),
+            model.changepoints_t
+        ) * model.y_scale + df['floor'].to_numpy()
+        
+        features, _, component_cols, modes = model.make_all_seasonality_features(df)
+        
+        # Coefficients per component; additive components are in units of y
+        scale = np.where(component_cols.columns.isin(modes['additive']), model.y_scale, 1.0)
+        weights = params['beta'].mean(axis=0)[:, None] * component_cols.to_numpy() * scale
+        
+        inputs = {
+            'ds': df['ds'].to_numpy(),
+            'trend': trend,
+            'features': features.to_numpy(dtype=np.float64),
+            'weights': weights,
+            'component_names': list(component_cols.columns),
+            'noise_width': NormalDist().inv_cdf((1 + model.interval_width) / 2) * float(params['sigma_obs'].mean()) * model.y_scale
+        }
+        
+        # Only use the fast path when it reproduces Prophet's point forecast for this model
+        if not self.check_fast_predict(model, future, inputs):
+            print("Fast predict disagrees with Prophet's predict; using model.predict")
+            return None
+        return inputs
+    
+    def _fast_predict(self, inputs: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Forecast from precomputed inputs: yhat = trend * (1 + multiplicative) + additive,
+        with an analytic observation-noise interval instead of Prophet's simulated one
+        """
+        forecast = pd.DataFrame(inputs['features'] @ inputs['weights'], columns=inputs['component_names'])
+        yhat = (inputs['trend'] * (1 + forecast['multiplicative_terms'].to_numpy()) +
+                forecast['additive_terms'].to_numpy())
+        
+        forecast.insert(0, 'ds', inputs['ds'])
+        forecast.insert(1, 'trend', inputs['trend'])
+        forecast['yhat_lower'] = yhat - inputs['noise_width']
+        forecast['yhat_upper'] = yhat + inputs['noise_width']
+        forecast['yhat'] = yhat
+        return forecast
+    
+    def check_fast_predict(self, model: Prophet, future: pd.DataFrame, inputs: Dict[str, Any]) -> bool:
+        """
+        Whether the fast path's yhat, trend and weekly/yearly components match model.predict on future
+        """
+        expected = model.predict(future)
+        actual = self._fast_predict(inputs)
+        return all(
+            column in actual.columns and
+            np.allclose(actual[column].to_numpy(), expected[column].to_numpy(), rtol=1e-6, atol=1e-6)
+            for column in FAST_PREDICT_CHECK_COLUMNS
+            if column in expected.columns
+        )
+    
     def forecast_all_departments(self,
                                 departments: List[str] = None,
                                 periods: int = 14) -> Dict[str, pd.DataFrame]:
@@ -249,56 +391,61 @@ class RetailDemandForecaster:
         
         all_forecasts = {}
         
+        # Departments without a model are independent fits; run them in parallel worker processes
+        untrained = [dept for dept in departments if dept not in self.models]
+        if any(dept not in self.history_by_department for dept in untrained):
+            self.generate_historical_data(departments=untrained)
+        
+        if len(untrained) > 1:
+            executor = get_fit_pool()
+            futures = [
+                executor.submit(
+                    fit_and_forecast,
+                    dept,
+                    self.history_by_department.get(dept),
+                    periods
+                )
+                for dept in untrained
+            ]
+            for future in as_completed(futures):
+                dept, forecast, model_json = future.result()
+                self.models[dept] = model_from_json(model_json)
+                self.forecast_results[dept] = forecast
+                all_forecasts[dept] = forecast
+        
         for dept in departments:
-            forecast = self.forecast_demand(dept, periods=periods)
-            all_forecasts[dept] = forecast
+            if dept not in all_forecasts:
+                all_forecasts[dept] = self.forecast_demand(dept, periods=periods)
         
-        return all_forecasts
+        return {dept: all_forecasts[dept] for dept in departments}
     
     def get_hourly_distribution(self, 
                                daily_customers: int,
-                               department: str) -> List[Dict[str, Any]]:
+                               department: str,
+                               rng: np.random.Generator = None) -> List[Dict[str, Any]]:
         """
         Distribute daily forecast into hourly predictions
         """
-        # Hourly distribution patterns by department
-        hourly_patterns = {
-            'default': [
-                0.02, 0.01, 0.01, 0.01, 0.02, 0.03,  # 12am-6am
-                0.04, 0.05, 0.07, 0.09, 0.11, 0.12,  # 6am-12pm
-                0.10, 0.09, 0.08, 0.07, 0.06, 0.05,  # 12pm-6pm
-                0.04, 0.03, 0.02, 0.01, 0.01, 0.01   # 6pm-12am
-            ],
-            'Grocery': [
-                0.01, 0.01, 0.01, 0.01, 0.02, 0.03,  # Early morning
-                0.05, 0.07, 0.09, 0.10, 0.11, 0.10,  # Morning rush
-                0.09, 0.08, 0.07, 0.06, 0.08, 0.09,  # Afternoon/evening
-                0.07, 0.05, 0.03, 0.02, 0.01, 0.01   # Late evening
-            ],
-            'Electronics': [
-                0.01, 0.01, 0.01, 0.01, 0.01, 0.02,  # Night
-                0.03, 0.04, 0.05, 0.07, 0.09, 0.11,  # Morning
-                0.12, 0.11, 0.10, 0.09, 0.08, 0.07,  # Afternoon/evening
-                0.06, 0.04, 0.02, 0.01, 0.01, 0.01   # Late night
-            ]
-        }
+        if rng is None:
+            rng = simulation_rng
+        pattern = HOURLY_PATTERNS.get(department, HOURLY_PATTERNS['default'])
         
-        pattern = hourly_patterns.get(department, hourly_patterns['default'])
+        customers = (daily_customers * pattern).astype(np.int64)
+        staff_needed = np.maximum(1, customers // 15)  # 1 staff per 15 customers/hour
+        confidence = 0.85 + rng.uniform(-0.1, 0.1, 24)
         
-        hourly_forecast = []
-        for hour in range(24):
-            customers = int(daily_customers * pattern[hour])
-            staff_needed = max(1, int(customers / 15))  # 1 staff per 15 customers/hour
-            
-            hourly_forecast.append({
+        return [
+            {
                 'hour': hour,
-                'hour_label': f"{hour:02d}:00",
-                'predicted_customers': customers,
-                'required_staff': staff_needed,
-                'confidence': 0.85 + random.uniform(-0.1, 0.1)
-            })
-        
-        return hourly_forecast
+                'hour_label': label,
+                'predicted_customers': hour_customers,
+                'required_staff': hour_staff,
+                'confidence': hour_confidence
+            }
+            for hour, label, hour_customers, hour_staff, hour_confidence in zip(
+                range(24), HOUR_LABELS, customers.tolist(), staff_needed.tolist(), confidence.tolist()
+            )
+        ]
     
     def create_forecast_visualization(self, 
                                      department: str) -> str:
@@ -309,68 +456,70 @@ class RetailDemandForecaster:
             return None
         
         forecast = self.forecast_results[department]
-        
-        # Create the plot
-        fig = go.Figure()
-        
-        # Add actual/predicted customer traffic
-        fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat'],
-            mode='lines',
-            name='Predicted Customers',
-            line=dict(color='blue', width=2)
-        ))
-        
-        # Add confidence intervals
-        fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat_upper'],
-            mode='lines',
-            name='Upper Bound',
-            line=dict(width=0),
-            showlegend=False
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat_lower'],
-            mode='lines',
-            name='Lower Bound',
-            fill='tonexty',
-            fillcolor='rgba(0,100,200,0.2)',
-            line=dict(width=0),
-            showlegend=False
-        ))
-        
-        # Add staffing requirements on secondary y-axis
-        fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['required_staff'],
-            mode='lines+markers',
-            name='Required Staff',
-            line=dict(color='green', width=2, dash='dash'),
-            marker=dict(size=6),
-            yaxis='y2'
-        ))
-        
-        # Update layout
-        fig.update_layout(
-            title=f'Demand Forecast - {department}',
-            xaxis_title='Date',
-            yaxis_title='Customer Traffic',
-            yaxis2=dict(
-                title='Required Staff',
-                overlaying='y',
-                side='right'
-            ),
-            hovermode='x unified',
-            height=400,
-            template='plotly_white'
-        )
+        ds = forecast['ds'].to_numpy()
+        
+        # Figure built as a plain dict; orjson writes the NumPy columns directly
+        figure = {
+            'data': [
+                # Actual/predicted customer traffic
+                {
+                    'type': 'scatter',
+                    'x': ds,
+                    'y': forecast['yhat'].to_numpy(),
+                    'mode': 'lines',
+                    'name': 'Predicted Customers',
+                    'line': {'color': 'blue', 'width': 2}
+                },
+                # Confidence intervals
+                {
+                    'type': 'scatter',
+                    'x': ds,
+                    'y': forecast['yhat_upper'].to_numpy(),
+                    'mode': 'lines',
+                    'name': 'Upper Bound',
+                    'line': {'width': 0},
+                    'showlegend': False
+                },
+                {
+                    'type': 'scatter',
+                    'x': ds,
+                    'y': forecast['yhat_lower'].to_numpy(),
+                    'mode': 'lines',
+                    'name': 'Lower Bound',
+                    'fill': 'tonexty',
+                    'fillcolor': 'rgba(0,100,200,0.2)',
+                    'line': {'width': 0},
+                    'showlegend': False
+                },
+                # Staffing requirements on secondary y-axis
+                {
+                    'type': 'scatter',
+                    'x': ds,
+                    'y': forecast['required_staff'].to_numpy(),
+                    'mode': 'lines+markers',
+                    'name': 'Required Staff',
+                    'line': {'color': 'green', 'width': 2, 'dash': 'dash'},
+                    'marker': {'size': 6},
+                    'yaxis': 'y2'
+                }
+            ],
+            'layout': {
+                'title': {'text': f'Demand Forecast - {department}'},
+                'xaxis': {'title': {'text': 'Date'}},
+                'yaxis': {'title': {'text': 'Customer Traffic'}},
+                'yaxis2': {
+                    'title': {'text': 'Required Staff'},
+                    'overlaying': 'y',
+                    'side': 'right'
+                },
+                'hovermode': 'x unified',
+                'height': 400,
+                'template': PLOT_TEMPLATE
+            }
+        }
         
         # Convert to JSON for frontend
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return orjson.dumps(figure, option=orjson.OPT_SERIALIZE_NUMPY).decode()
     
     def get_optimization_insights(self, 
                                  departments: List[str]) -> Dict[str, Any]:
@@ -390,33 +539,36 @@ class RetailDemandForecaster:
                 continue
             
             forecast = self.forecast_results[dept]
-            future_forecast = forecast[forecast['ds'] > datetime.now()]
+            future = slice(self._future_start(forecast), None)
             
-            if len(future_forecast) > 0:
+            if len(forecast) > future.start:
+                ds = forecast['ds'].to_numpy()[future]
+                yhat = forecast['yhat'].to_numpy()[future]
+                yhat_lower = forecast['yhat_lower'].to_numpy()[future]
+                yhat_upper = forecast['yhat_upper'].to_numpy()[future]
+                required_staff = forecast['required_staff'].to_numpy()[future]
+                
                 # Find peak days
-                peak_day = future_forecast.loc[future_forecast['yhat'].idxmax()]
+                peak = int(yhat.argmax())
                 insights['peak_periods'].append({
                     'department': dept,
-                    'date': peak_day['ds'].strftime('%Y-%m-%d'),
-                    'expected_customers': int(peak_day['yhat']),
-                    'required_staff': int(peak_day['required_staff'])
+                    'date': pd.Timestamp(ds[peak]).strftime('%Y-%m-%d'),
+                    'expected_customers': int(yhat[peak]),
+                    'required_staff': int(required_staff[peak])
                 })
                 
                 # Find low periods
-                low_day = future_forecast.loc[future_forecast['yhat'].idxmin()]
+                low = int(yhat.argmin())
                 insights['low_periods'].append({
                     'department': dept,
-                    'date': low_day['ds'].strftime('%Y-%m-%d'),
-                    'expected_customers': int(low_day['yhat']),
-                    'required_staff': int(low_day['required_staff'])
+                    'date': pd.Timestamp(ds[low]).strftime('%Y-%m-%d'),
+                    'expected_customers': int(yhat[low]),
+                    'required_staff': int(required_staff[low])
                 })
                 
                 # Calculate average confidence
-                avg_confidence = 1 - (
-                    (future_forecast['yhat_upper'] - future_forecast['yhat_lower']) / 
-                    (2 * future_forecast['yhat'])
-                ).mean()
-                insights['confidence_scores'][dept] = round(avg_confidence, 3)
+                avg_confidence = 1 - np.mean((yhat_upper - yhat_lower) / (2 * yhat))
+                insights['confidence_scores'][dept] = round(float(avg_confidence), 3)
         
         # Generate recommendations
         insights['staffing_recommendations'] = [
@@ -427,6 +579,10 @@ class RetailDemandForecaster:
         
         return insights
     
+    def _future_start(self, forecast: pd.DataFrame) -> int:
+        """Index of the first forecast row after now; ds is sorted, so a binary search replaces the mask"""
+        return int(np.searchsorted(forecast['ds'].to_numpy(), np.datetime64(datetime.now()), side='right'))
+    
     def export_forecast_data(self, 
                             departments: List[str],
                             format: str = 'json') -> Any:
@@ -440,23 +596,70 @@ class RetailDemandForecaster:
                 continue
             
             forecast = self.forecast_results[dept]
-            future_forecast = forecast[forecast['ds'] > datetime.now()].head(14)
+            start = self._future_start(forecast)
+            future_forecast = forecast.iloc[start:start + 14]
             
+            # Columns stay NumPy arrays; orjson serializes them without building Python lists
             export_data[dept] = {
                 'dates': future_forecast['ds'].dt.strftime('%Y-%m-%d').tolist(),
-                'predicted_customers': future_forecast['yhat'].round().tolist(),
-                'required_staff': future_forecast['required_staff'].tolist(),
-                'confidence_lower': future_forecast['yhat_lower'].round().tolist(),
-                'confidence_upper': future_forecast['yhat_upper'].round().tolist()
+                'predicted_customers': np.round(future_forecast['yhat'].to_numpy()).astype(np.int32),
+                'required_staff': future_forecast['required_staff'].to_numpy(),
+                'confidence_lower': np.round(future_forecast['yhat_lower'].to_numpy()).astype(np.int32),
+                'confidence_upper': np.round(future_forecast['yhat_upper'].to_numpy()).astype(np.int32)
             }
         
         if format == 'json':
-            return json.dumps(export_data, indent=2)
+            return orjson.dumps(export_data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
         elif format == 'dataframe':
-            return pd.DataFrame(export_data)
+            return pd.DataFrame.from_dict(export_data, orient='index')
         else:
-            return export_data
+            return {
+                dept: {column: np.asarray(values).tolist() for column, values in columns.items()}
+                for dept, columns in export_data.items()
+            }
+
+
+def fit_and_forecast(department: str, dept_data: pd.DataFrame, periods: int) -> Tuple[str, pd.DataFrame, str]:
+    """
+    Fit and forecast one department in a worker process; returns (department, forecast, model JSON)
+    """
+    worker = RetailDemandForecaster()
+    worker.historical_data = dept_data
+    worker.history_by_department = {department: dept_data}
+    forecast = worker.forecast_demand(department, periods=periods)
+    return department, forecast, model_to_json(worker.models[department])
+
+
+def get_fit_pool() -> ProcessPoolExecutor:
+    """
+    Shared worker pool for department fits, created on first use; workers are spawned rather than
+    forked so they don't inherit locks held by the server's other threads (e.g. a warm-up fit)
+    """
+    global fit_pool
+    with fit_pool_lock:
+        if fit_pool is None:
+            fit_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return fit_pool
+
+
+def warmup():
+    """
+    Pay Prophet's first-fit (Stan model load) cost before the first real forecast
+    """
+    try:
+        tiny = pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=30, freq='D'), 'y': np.arange(30.0)})
+        model = Prophet().fit(tiny)
+        model.predict(model.make_future_dataframe(periods=1, include_history=False))
+    except Exception as e:
+        print(f"Prophet warm-up failed: {e}")
 
 
 # Singleton instance for use across the application
-forecaster = RetailDemandForecaster()
\ No newline at end of file
+forecaster = RetailDemandForecaster()
+
+# Warm up in the background in the main process only (not in forecast worker processes)
+if multiprocessing.parent_process() is None and not os.environ.get('PROPHET_DISABLE_WARMUP'):
+    threading.Thread(target=warmup, daemon=True).start()
\ No newline at end of file
@@ -5,14 +5,25 @@ Using CrewAI with OpenAI GPT for real reasoning
 """
 
 import json
+import os
 import asyncio
+import orjson
+import pandas as pd
 from typing import Dict, Any, List
 from datetime import datetime
 from crewai import Agent, Task, Crew, Process
 
+# Crew execution traces are large; print them only when asked to
+CREW_VERBOSE = os.getenv('CREW_VERBOSE', '').lower() in ('1', 'true', 'yes')
+
+json_decoder = json.JSONDecoder()
+
 class RetentionAgentsManager:
     """Manages AI agents for retention analytics"""
     
+    STRATEGY_INPUT_CHARS = 1500  # Per-analysis limit on the compact JSON passed to the strategist
+    STRATEGY_LIST_ITEMS = 5  # List items kept per field when an analysis is over the limit
+    
     def __init__(self):
         """Initialize retention analytics agents"""
         
@@ -23,7 +34,7 @@ class RetentionAgentsManager:
             backstory="""You are a People Analytics expert specializing in predictive retention modeling.
                        With 15 years of HR data science experience, you excel at identifying early warning signs
                        of employee turnover through behavioral and performance indicators.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -34,7 +45,7 @@ class RetentionAgentsManager:
             backstory="""You are an Employee Experience expert focused on engagement measurement.
                        You specialize in interpreting engagement data, survey responses, and behavioral
                        indicators to assess employee satisfaction and commitment levels.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -45,7 +56,7 @@ class RetentionAgentsManager:
             backstory="""You are a Career Development expert with deep knowledge of skill progression
                        and internal mobility strategies. You excel at creating customized development
                        plans that align employee aspirations with organizational needs.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -56,7 +67,7 @@ class RetentionAgentsManager:
             backstory="""You are a Total Rewards specialist with expertise in market benchmarking
                        and compensation strategy. You ensure pay equity and competitive positioning
                        to support retention goals.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -67,7 +78,7 @@ class RetentionAgentsManager:
             backstory="""You are a senior HR strategist with 20 years of experience in talent retention.
                        You excel at developing holistic retention programs that address multiple factors
                        including culture, growth, compensation, and work-life balance.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
     
@@ -84,15 +95,17 @@ class RetentionAgentsManager:
             Comprehensive retention insights and recommendations
         """
         
+        stats = self._workforce_stats(employee_data)
+        
         # Step 1: Risk Analysis
         risk_task = Task(
             description=f"""
             Analyze retention risks for the workforce of {len(employee_data)} employees.
             
             Employee Data Sample:
-            - Average tenure: {sum(e.get('tenure_days', 365) for e in employee_data) / len(employee_data):.0f} days
-            - Departments: {list(set(e.get('department', 'Unknown') for e in employee_data))}
-            - Overtime patterns: {sum(1 for e in employee_data if e.get('overtime_hours', 0) > 10)} employees with high overtime
+            - Average tenure: {stats['avg_tenure']:.0f} days
+            - Departments: {stats['departments']}
+            - Overtime patterns: {stats['high_overtime']} employees with high overtime
             
             Identify:
             1. High-risk employees (provide specific risk scores 0-100)
@@ -106,15 +119,6 @@ class RetentionAgentsManager:
             expected_output="JSON with retention risk analysis including scores, factors, and patterns"
         )
         
-        crew = Crew(
-            agents=[self.risk_analyzer],
-            tasks=[risk_task],
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        risk_result = crew.kickoff()
-        
         # Step 2: Engagement Analysis
         engagement_task = Task(
             description=f"""
@@ -135,15 +139,6 @@ class RetentionAgentsManager:
             expected_output="JSON with engagement analysis and improvement recommendations"
         )
         
-        crew = Crew(
-            agents=[self.engagement_monitor],
-            tasks=[engagement_task],
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        engagement_result = crew.kickoff()
-        
         # Step 3: Career Development Planning
         career_task = Task(
             description=f"""
@@ -162,15 +157,6 @@ class RetentionAgentsManager:
             expected_output="JSON with career development strategies and pathways"
         )
         
-        crew = Crew(
-            agents=[self.career_advisor],
-            tasks=[career_task],
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        career_result = crew.kickoff()
-        
         # Step 4: Compensation Analysis
         comp_task = Task(
             description=f"""
@@ -182,7 +168,7 @@ class RetentionAgentsManager:
             3. Total rewards effectiveness
             4. Performance-based incentive opportunities
             
-            Average hourly wage: ${sum(e.get('hourly_wage', 20) for e in employee_data) / len(employee_data):.2f}
+            Average hourly wage: ${stats['avg_wage']:.2f}
             
             Recommend targeted adjustments for retention.
             Return JSON with compensation_analysis and recommendations.
@@ -191,14 +177,17 @@ class RetentionAgentsManager:
             expected_output="JSON with compensation analysis and adjustment recommendations"
         )
         
-        crew = Crew(
-            agents=[self.compensation_analyst],
-            tasks=[comp_task],
-            process=Process.sequential,
-            verbose=True
+        # Steps 1-4 are independent of each other; run them concurrently
+        risk_result, engagement_result, career_result, comp_result = await asyncio.gather(
+            self._run_task(self.risk_analyzer, risk_task),
+            self._run_task(self.engagement_monitor, engagement_task),
+            self._run_task(self.career_advisor, career_task),
+            self._run_task(self.compensation_analyst, comp_task)
         )
-        
-        comp_result = crew.kickoff()
+        risk_analysis = self._parse_json_response(risk_result, 'risk_analysis')
+        engagement_metrics = self._parse_json_response(engagement_result, 'engagement')
+        career_development = self._parse_json_response(career_result, 'career')
+        compensation_insights = self._parse_json_response(comp_result, 'compensation')
         
         # Step 5: Comprehensive Strategy
         strategy_task = Task(
@@ -206,10 +195,10 @@ class RetentionAgentsManager:
             Synthesize all retention insights into a comprehensive strategy.
             
             Inputs:
-            - Risk Analysis: {risk_result}
-            - Engagement Insights: {engagement_result}
-            - Career Development: {career_result}
-            - Compensation Analysis: {comp_result}
+            - Risk Analysis: {self._strategy_input(risk_analysis)}
+            - Engagement Insights: {self._strategy_input(engagement_metrics)}
+            - Career Development: {self._strategy_input(career_development)}
+            - Compensation Analysis: {self._strategy_input(compensation_insights)}
             
             Create:
             1. Priority retention initiatives (top 5)
@@ -224,27 +213,20 @@ class RetentionAgentsManager:
             expected_output="JSON with comprehensive retention strategy and implementation plan"
         )
         
-        crew = Crew(
-            agents=[self.retention_strategist],
-            tasks=[strategy_task],
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        strategy_result = crew.kickoff()
+        strategy_result = await self._run_task(self.retention_strategist, strategy_task)
         
         # Compile final results
         return {
             'analysis_id': f'retention_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
             'timestamp': datetime.now().isoformat(),
             'workforce_size': len(employee_data),
-            'risk_analysis': self._parse_json_response(risk_result, 'risk_analysis'),
-            'engagement_metrics': self._parse_json_response(engagement_result, 'engagement'),
-            'career_development': self._parse_json_response(career_result, 'career'),
-            'compensation_insights': self._parse_json_response(comp_result, 'compensation'),
+            'risk_analysis': risk_analysis,
+            'engagement_metrics': engagement_metrics,
+            'career_development': career_development,
+            'compensation_insights': compensation_insights,
             'retention_strategy': self._parse_json_response(strategy_result, 'strategy'),
             'executive_summary': {
-                'high_risk_count': len([e for e in employee_data if hash(e.get('employee_id', e.get('id', 'unknown'))) % 10 < 3]),  # Simulated
+                'high_risk_count': stats['high_risk_count'],  # Simulated
                 'average_risk_score': 42,  # Would be calculated from actual risk analysis
                 'top_risk_factors': ['Limited growth opportunities', 'Compensation gaps', 'Work-life balance'],
                 'estimated_turnover_cost': len(employee_data) * 0.15 * 50000,  # 15% turnover * $50k replacement cost
@@ -252,25 +234,83 @@ class RetentionAgentsManager:
             }
         }
     
+    def _workforce_stats(self, employee_data: List[Dict]) -> Dict[str, Any]:
+        """Workforce aggregates for the task prompts, computed in one vectorized pass"""
+        df = pd.DataFrame(employee_data)
+        
+        def column(name, default):
+            if name in df:
+                return df[name].fillna(default)
+            return pd.Series(default, index=df.index)
+        
+        # Built without fillna(None), which pandas 2.x rejects
+        ids = df['employee_id'] if 'employee_id' in df else pd.Series(index=df.index, dtype=object)
+        if 'id' in df:
+            ids = ids.fillna(df['id'])
+        ids = ids.fillna('unknown').astype(str)
+        
+        return {
+            'avg_tenure': float(column('tenure_days', 365).mean()),
+            'departments': column('department', 'Unknown').unique().tolist(),
+            'high_overtime': int((column('overtime_hours', 0) > 10).sum()),
+            'avg_wage': float(column('hourly_wage', 20).mean()),
+            # Deterministic stand-in for a risk model: ~30% of employees by id hash
+            'high_risk_count': int((pd.util.hash_pandas_object(ids, index=False) % 10 < 3).sum())
+        }
+    
+    async def _run_task(self, agent: Agent, task: Task):
+        """Run task on a fresh single-agent crew off the event loop"""
+        # A crew per kickoff, so a kickoff left running by a cancelled caller never shares its crew
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=CREW_VERBOSE
+        )
+        return await asyncio.to_thread(crew.kickoff)
+    
+    def _strategy_input(self, analysis: Dict) -> str:
+        """Compact JSON of a parsed analysis, trimmed by whole fields to fit the strategy prompt"""
+        trimmed = dict(analysis)
+        text = json.dumps(trimmed, separators=(',', ':'), default=str)
+        if len(text) <= self.STRATEGY_INPUT_CHARS:
+            return text
+        
+        # Shorten long lists first, then drop trailing top-level fields; the result stays valid JSON
+        for key, value in trimmed.items():
+            if isinstance(value, list):
+                trimmed[key] = value[:self.STRATEGY_LIST_ITEMS]
+        text = json.dumps(trimmed, separators=(',', ':'), default=str)
+        while len(text) > self.STRATEGY_INPUT_CHARS and len(trimmed) > 1:
+            trimmed.popitem()
+            text = json.dumps(trimmed, separators=(',', ':'), default=str)
+        return text
+    
     def _parse_json_response(self, response: str, category: str) -> Dict:
         """Parse AI agent response to extract JSON data"""
-        try:
-            # Try to parse as JSON directly
-            if isinstance(response, dict):
-                return response
-            
-            # Extract JSON from string response
-            response_str = str(response)
+        if isinstance(response, dict):
+            return response
+        
+        # Decode the first JSON object in the response, ignoring any trailing text
+        response_str = str(response)
+        json_start = response_str.find('{')
+        if json_start != -1:
+            try:
+                parsed, _ = json_decoder.raw_decode(response_str, json_start)
+                if isinstance(parsed, dict):
+                    return parsed
+            except ValueError:
+                pass
             
-            # Look for JSON markers
-            json_start = response_str.find('{')
+            # Fall back to the outermost braces
             json_end = response_str.rfind('}') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                json_str = response_str[json_start:json_end]
-                return json.loads(json_str)
-        except:
-            pass
+            if json_end > json_start:
+                try:
+                    parsed = orjson.loads(response_str[json_start:json_end])
+                    if isinstance(parsed, dict):
+                        return parsed
+                except orjson.JSONDecodeError:
+                    pass
         
         # Fallback structure
         return {
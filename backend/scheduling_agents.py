@@ -6,12 +6,128 @@ This version uses actual AI reasoning instead of simulation
 import asyncio
 import json
 import random
+import re
+import orjson
+import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from crewai import Agent, Task, Crew, Process
-import copy
+from pydantic import BaseModel
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import functools
+import itertools
+import os
+import time
+import traceback
+
+# Structural characters scanned when locating a JSON object in agent output
+JSON_TOKENS = re.compile(r'[{}"\\]')
+
+# Agent/crew traces, full agent responses and per-shift details are large; print them only when asked to
+CREW_VERBOSE = os.getenv('CREW_VERBOSE', '').lower() in ('1', 'true', 'yes')
+
+# Text extraction patterns for agent responses that are not JSON
+DEMAND_PERCENT_PATTERNS = {
+    dept: re.compile(f'{dept}.*?(\\d+)%', re.IGNORECASE)
+    for dept in ['Electronics', 'Sales Floor', 'Customer Service']
+}
+SHIFT_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+        # Pattern: "Employee: John, Department: Sales Floor, Day: Monday, Time: 9:00-17:00"
+        r'Employee:\s*(\w+).*?Department:\s*([^,\n]+).*?Day:\s*(\w+).*?Time:\s*(\d+:\d+)-(\d+:\d+)',
+        # Pattern: "Monday: Sales Floor - Employee123 (9:00-17:00)"
+        r'(\w+):\s*([^-\n]+)-\s*(\w+)\s*\((\d+:\d+)-(\d+:\d+)\)',
+        # Pattern: "Sales Floor: Monday 9:00-17:00 (Employee123)"
+        r'([^:\n]+):\s*(\w+)\s*(\d+:\d+)-(\d+:\d+)\s*\(([^)]+)\)'
+    )
+]
+DOLLAR_AMOUNT_PATTERN = re.compile(r'\$(\d+(?:,\d+)?(?:\.\d+)?)')
+QUALITY_SCORE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:out of 10|/10)')
+# Case-insensitive by character class rather than re.IGNORECASE
+EMPLOYEE_MENTION_PATTERN = re.compile(r'[Ee][Mm][Pp][Ll][Oo][Yy][Ee][Ee][_\s]*(\w+)')
+
+# Fallback schedule shifts: (name, start, end)
+FALLBACK_SHIFT_TIMES = [('morning', '08:00', '16:00'), ('evening', '14:00', '22:00')]
+
+# Errors a malformed agent response can raise while it is parsed and validated
+# (JSON decode and pydantic validation errors are ValueErrors)
+PARSE_ERRORS = (ValueError, KeyError, TypeError, AttributeError)
+
+# Concurrent LLM calls across all optimizations; lower it for rate-limited providers
+MAX_CONCURRENT_KICKOFFS = int(os.getenv('MAX_CONCURRENT_KICKOFFS', '5'))
+
+# Agent status updates waiting to be broadcast; the oldest is dropped when full
+STATUS_QUEUE_SIZE = 256
+STATUS_BATCH_SIZE = 50  # Updates broadcast before yielding back to the event loop
+
+# Structured outputs for the stages that must return JSON; CrewAI validates the answer against them
+class DepartmentAllocation(BaseModel):
+    percentage: float
+    reasoning: str = ''
+
+class DemandOutput(BaseModel):
+    department_allocations: Dict[str, DepartmentAllocation]
+    daily_breakdown: List[Dict[str, Any]] = []
+
+class Shift(BaseModel):
+    id: str
+    employee_id: str
+    employee_name: str
+    department: str
+    day: Union[int, str]  # Day index 0-6; names are normalized when results are compiled
+    start_time: str
+    end_time: str
+    confidence: float = 0.85
+    reason: str = ''
+
+class ScheduleOutput(BaseModel):
+    shifts: List[Shift]
+
+# Staff optimization prompt; static instructions first, per-run data last
+STAFF_TASK_TEMPLATE = """
+Create optimal staff schedules. OUTPUT ONLY VALID JSON, NOTHING ELSE.
+
+For the full schedule, create shifts following this pattern:
+- Morning shift: 09:00-17:00
+- Evening shift: 17:00-21:00
+- Days: 0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday, 5=Saturday, 6=Sunday
+- Each shift needs: id, employee_id, employee_name, department, day, start_time, end_time, confidence, reason
+
+CRITICAL REQUIREMENT: You MUST create shifts for ALL of these departments: {departments}
+Each department needs 2 shifts per day (morning and evening) for all 7 days.
+That means {department_count} departments × 2 shifts × 7 days = {total_shifts} total shifts.
+
+YOU MUST OUTPUT EXACTLY THIS JSON STRUCTURE (example shows Day 0 morning shifts for each department):
+{example_json}
+
+IMPORTANT: 
+- Include ALL departments: {department_list}
+- Each department MUST have shifts for all 7 days
+
+Department Demand: {demand_json}
+Employees: {employee_context}
+
+CRITICAL: Output ONLY the JSON object. No explanations, no text before or after.
+"""
+
+@functools.lru_cache(maxsize=32)
+def staff_example_json(departments: tuple) -> str:
+    """Compact example output for the staff prompt: a Day 0 morning shift per requested department"""
+    example_shifts = []
+    for i, dept in enumerate(departments):
+        dept_key = dept.lower().replace(' ', '_')
+        example_shifts.append({
+            "id": f"shift_0_{dept_key}_morning",
+            "employee_id": f"emp_{i:03d}",
+            "employee_name": f"Employee {i+1}",
+            "department": dept,
+            "day": 0,
+            "start_time": "09:00",
+            "end_time": "17:00",
+            "confidence": 0.85 + (i * 0.02),
+            "reason": f"Experienced employee for {dept}"
+        })
+    return json.dumps({"shifts": example_shifts}, separators=(',', ':'))
 
 class SchedulingAgentsManager:
     """Manager for AI-powered scheduling agents using CrewAI"""
@@ -20,7 +136,12 @@ class SchedulingAgentsManager:
         self.websocket_manager = websocket_manager
         self.initialize_agents()
         self.employees_data = self._generate_realistic_employees()
-        self.executor = ThreadPoolExecutor(max_workers=5)  # For running blocking crew operations
+        self._build_employee_arrays()
+        self.cached_employee_context = functools.lru_cache(maxsize=16)(self._employee_context)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_KICKOFFS)  # For running blocking crew operations
+        self.kickoff_slots = asyncio.Semaphore(MAX_CONCURRENT_KICKOFFS)
+        self.status_queue = None  # Created with its consumer task on first status update
+        self.status_task = None
         print(f"SchedulingAgentsManager initialized with {len(self.employees_data)} employees")
     
     def initialize_agents(self):
@@ -34,7 +155,7 @@ class SchedulingAgentsManager:
             You excel at analyzing store traffic patterns and understanding department-specific customer behavior. 
             You know that Electronics gets more traffic on weekends, Sales Floor is consistent, and Customer Service 
             varies with returns and issues. Your allocations are data-driven and logical.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -46,7 +167,7 @@ class SchedulingAgentsManager:
             You understand how to match employee skills, availability, and preferences to create schedules that 
             minimize costs while ensuring adequate coverage. You consider peak hours, break requirements, and 
             employee satisfaction in your decisions.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -57,7 +178,7 @@ class SchedulingAgentsManager:
             backstory="""You are a financial analyst specializing in retail labor economics. 
             You calculate total compensation including regular pay and overtime, identify cost-saving 
             opportunities, and ensure the schedule stays within budget while maintaining service quality.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -68,7 +189,7 @@ class SchedulingAgentsManager:
             backstory="""You are an expert in labor law with comprehensive knowledge of break requirements, 
             overtime regulations, maximum shift lengths, and minimum rest periods. You identify compliance 
             risks and ensure all schedules meet legal requirements.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
         
@@ -79,19 +200,42 @@ class SchedulingAgentsManager:
             backstory="""You are a quality assurance specialist focused on both operational excellence 
             and employee wellbeing. You assess schedule fairness, workload distribution, skill utilization, 
             and identify improvements to enhance both efficiency and satisfaction.""",
-            verbose=True,
+            verbose=CREW_VERBOSE,
             allow_delegation=False
         )
     
+    async def run_agent_task(self, agent: Agent, task: Task, timeout: int = 60) -> Any:
+        """Run task on a fresh single-agent crew with timeout handling"""
+        # A crew per kickoff: building one is cheap next to the LLM call, and a crew whose
+        # kickoff outlived its timeout is never handed to another request.
+        # Stages are not chained in one sequential crew: each has its own timeout and fallback,
+        # the schedule is validated between stages, and the review stages run concurrently.
+        # LiteLLM keeps its HTTP clients per process, so separate kickoffs still share connections.
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=CREW_VERBOSE,
+            max_execution_time=300  # 5 minutes timeout
+        )
+        return await self.run_crew_with_timeout(crew, timeout=timeout)
+    
     async def run_crew_with_timeout(self, crew: Crew, timeout: int = 60) -> Any:
         """Run crew.kickoff() with proper timeout handling"""
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         
         try:
-            # Run the blocking crew.kickoff() in a thread pool with timeout
-            future = loop.run_in_executor(self.executor, crew.kickoff)
-            result = await asyncio.wait_for(future, timeout=timeout)
-            return result
+            # Run the blocking crew.kickoff() in a thread pool with timeout. A slot is held until
+            # the kickoff thread finishes, even after a timeout, so slots never outnumber free
+            # executor workers and the timeout starts once the kickoff is actually running
+            await self.kickoff_slots.acquire()
+            try:
+                future = loop.run_in_executor(self.executor, crew.kickoff)
+            except BaseException:
+                self.kickoff_slots.release()
+                raise
+            future.add_done_callback(self._release_kickoff_slot)
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
         except asyncio.TimeoutError:
             print(f"Crew execution timed out after {timeout} seconds")
             raise TimeoutError(f"Crew execution exceeded {timeout} seconds")
@@ -99,29 +243,59 @@ class SchedulingAgentsManager:
             print(f"Crew execution failed: {e}")
             raise
     
+    def _release_kickoff_slot(self, future: asyncio.Future):
+        """Free a kickoff slot once its executor thread is done"""
+        self.kickoff_slots.release()
+        if not future.cancelled():
+            future.exception()  # Retrieved here when a timed-out kickoff later fails
+    
     async def broadcast_agent_status(self, agent_name: str, status: str, progress: int, 
                                     decision: str, confidence: float = 0.0):
-        """Broadcast agent status updates via WebSocket"""
-        if self.websocket_manager:
-            message = {
-                'type': 'agent_update',
-                'agent': agent_name,
-                'status': status,
-                'progress': progress,
-                'decision': decision,
-                'confidence': confidence,
-                'timestamp': datetime.now().isoformat()
-            }
-            try:
-                # Check if websocket manager has active connections
-                if hasattr(self.websocket_manager, 'active_connections') and self.websocket_manager.active_connections:
-                    await self.websocket_manager.broadcast(json.dumps(message))
-                    print(f"Broadcasted status for {agent_name}: {status} ({progress}%)")
-                else:
-                    print(f"No active WebSocket connections, status logged: {agent_name}: {status} ({progress}%)")
-            except Exception as e:
-                print(f"WebSocket broadcast failed (continuing execution): {agent_name}: {status} - Error: {e}")
-                # Continue execution regardless of WebSocket issues
+        """Queue an agent status update for WebSocket broadcast without waiting on clients"""
+        if not self.websocket_manager:
+            return
+        
+        # Only the raw fields and a clock reading are taken here; the consumer builds and serializes the message
+        update = (agent_name, status, progress, decision, confidence, time.time())
+        
+        if self.status_task is None or self.status_task.done():
+            if self.status_queue is None:
+                self.status_queue = asyncio.Queue(maxsize=STATUS_QUEUE_SIZE)
+            self.status_task = asyncio.create_task(self._broadcast_status_updates())
+        
+        if self.status_queue.full():
+            dropped = self.status_queue.get_nowait()
+            print(f"Status queue full, dropping update: {dropped[0]}: {dropped[1]}")
+        self.status_queue.put_nowait(update)
+    
+    async def _broadcast_status_updates(self):
+        """Drain the status queue, broadcasting in batches and yielding between them"""
+        while True:
+            batch = [await self.status_queue.get()]
+            while len(batch) < STATUS_BATCH_SIZE and not self.status_queue.empty():
+                batch.append(self.status_queue.get_nowait())
+            
+            for agent_name, status, progress, decision, confidence, timestamp in batch:
+                try:
+                    # Check if websocket manager has active connections
+                    if hasattr(self.websocket_manager, 'active_connections') and self.websocket_manager.active_connections:
+                        message = {
+                            'type': 'agent_update',
+                            'agent': agent_name,
+                            'status': status,
+                            'progress': progress,
+                            'decision': decision,
+                            'confidence': confidence,
+                            'timestamp': datetime.fromtimestamp(timestamp).isoformat()
+                        }
+                        await self.websocket_manager.broadcast(json.dumps(message))
+                        print(f"Broadcasted status for {agent_name}: {status} ({progress}%)")
+                    else:
+                        print(f"No active WebSocket connections, status logged: {agent_name}: {status} ({progress}%)")
+                except Exception as e:
+                    print(f"WebSocket broadcast failed (continuing execution): {agent_name}: {status} - Error: {e}")
+            
+            await asyncio.sleep(0)
     
     async def optimize_schedule_with_agents(self, request: Dict[str, Any], 
                                            prophet_forecast: Dict[str, Any]) -> Dict[str, Any]:
@@ -146,10 +320,9 @@ class SchedulingAgentsManager:
         
         try:
             # Prepare employee context
-            employee_context = self._prepare_employee_context(departments)
+            employee_context = self.cached_employee_context(tuple(sorted(set(departments))))
             
             await self.broadcast_agent_status("system", "starting", 0, "Initializing AI-powered schedule optimization...")
-            await asyncio.sleep(0.5)
             
             # Step 1: Demand Forecasting - Allocate store traffic to departments
             await self.broadcast_agent_status("demand_forecaster", "analyzing", 10, "Analyzing Prophet forecast...")
@@ -158,13 +331,6 @@ class SchedulingAgentsManager:
                 description=f"""
             Analyze the store-wide customer forecast from Prophet model and allocate to departments.
             
-            Prophet Forecast Data:
-            - Total weekly customers: {prophet_forecast.get('total_weekly_customers', 7000)}
-            - Daily breakdown: {json.dumps(prophet_forecast.get('daily_customers', []))}
-            - Peak days: {prophet_forecast.get('peak_days', ['Friday', 'Saturday'])}
-            
-            Departments to allocate: {departments}
-            
             Consider:
             1. Day-of-week patterns (weekends busier for Electronics, weekdays for Customer Service)
             2. Department characteristics (Sales Floor gets most traffic, Electronics seasonal)
@@ -181,21 +347,21 @@ class SchedulingAgentsManager:
                     {{"day": "Monday", "Electronics": 200, "Sales Floor": 400, "Customer Service": 300}}
                 ]
             }}
+            
+            Prophet Forecast Data:
+            - Total weekly customers: {prophet_forecast.get('total_weekly_customers', 7000)}
+            - Daily breakdown: {json.dumps(prophet_forecast.get('daily_customers', []))}
+            - Peak days: {prophet_forecast.get('peak_days', ['Friday', 'Saturday'])}
+            
+            Departments to allocate: {departments}
             """,
             agent=self.demand_agent,
-            expected_output="JSON with department allocations, daily breakdown, and reasoning"
+            expected_output="JSON with department allocations, daily breakdown, and reasoning",
+            output_pydantic=DemandOutput
         )
         
-            crew = Crew(
-                agents=[self.demand_agent],
-                tasks=[demand_task],
-                process=Process.sequential,
-                verbose=True,
-                max_execution_time=300  # 5 minutes timeout
-            )
-        
             try:
-                demand_result = await self.run_crew_with_timeout(crew, timeout=180)
+                demand_result = await self.run_agent_task(self.demand_agent, demand_task, timeout=180)
                 await self.broadcast_agent_status("demand_forecaster", "completed", 25, 
                                                  "Department demand forecast completed", 0.92)
             except TimeoutError:
@@ -208,73 +374,30 @@ class SchedulingAgentsManager:
             try:
                 demand_data = self._parse_agent_response(demand_result, 'demand')
                 print(f"Successfully parsed demand data from AI agent")
-            except Exception as e:
+            except PARSE_ERRORS as e:
                 print(f"ERROR: Failed to parse demand data: {e}")
                 demand_data = {'error': str(e)}
             
-            await asyncio.sleep(1.0)
-            
             # Step 2: Staff Optimization - Create shifts based on demand
             await self.broadcast_agent_status("staff_optimizer", "analyzing", 30, "Creating optimal shift assignments...")
             
-            # Build dynamic examples for ALL requested departments
-            example_shifts = []
-            for i, dept in enumerate(departments):
-                dept_key = dept.lower().replace(' ', '_')
-                example_shifts.append({
-                    "id": f"shift_0_{dept_key}_morning",
-                    "employee_id": f"emp_{i:03d}",
-                    "employee_name": f"Employee {i+1}",
-                    "department": dept,
-                    "day": 0,
-                    "start_time": "09:00",
-                    "end_time": "17:00",
-                    "confidence": 0.85 + (i * 0.02),
-                    "reason": f"Experienced employee for {dept}"
-                })
-            
-            example_json = json.dumps({"shifts": example_shifts}, indent=12)
-            
             staff_task = Task(
-                description=f"""
-                Create optimal staff schedules. OUTPUT ONLY VALID JSON, NOTHING ELSE.
-                
-                Department Demand: {json.dumps(demand_data, indent=2)}
-                Employees: {employee_context}
-                
-                CRITICAL REQUIREMENT: You MUST create shifts for ALL of these departments: {departments}
-                Each department needs 2 shifts per day (morning and evening) for all 7 days.
-                That means {len(departments)} departments × 2 shifts × 7 days = {len(departments) * 2 * 7} total shifts.
-                
-                YOU MUST OUTPUT EXACTLY THIS JSON STRUCTURE (example shows Day 0 morning shifts for each department):
-                {example_json}
-                
-                For the full schedule, create shifts following this pattern:
-                - Morning shift: 09:00-17:00
-                - Evening shift: 17:00-21:00
-                - Days: 0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday, 5=Saturday, 6=Sunday
-                
-                IMPORTANT: 
-                - Include ALL departments: {', '.join(departments)}
-                - Each department MUST have shifts for all 7 days
-                - Each shift needs: id, employee_id, employee_name, department, day, start_time, end_time, confidence, reason
-                
-                CRITICAL: Output ONLY the JSON object. No explanations, no text before or after.
-                """,
+                description=STAFF_TASK_TEMPLATE.format(
+                    departments=departments,
+                    department_count=len(departments),
+                    total_shifts=len(departments) * 2 * 7,
+                    example_json=staff_example_json(tuple(departments)),
+                    department_list=', '.join(departments),
+                    demand_json=json.dumps(demand_data, separators=(',', ':')),
+                    employee_context=employee_context
+                ),
                 agent=self.staff_agent,
-                expected_output="Valid JSON object containing shifts array with shifts for ALL requested departments"
-            )
-            
-            crew = Crew(
-                agents=[self.staff_agent],
-                tasks=[staff_task],
-                process=Process.sequential,
-                verbose=True,
-                max_execution_time=300  # 5 minutes timeout
+                expected_output="Valid JSON object containing shifts array with shifts for ALL requested departments",
+                output_pydantic=ScheduleOutput
             )
             
             try:
-                staff_result = await self.run_crew_with_timeout(crew, timeout=180)
+                staff_result = await self.run_agent_task(self.staff_agent, staff_task, timeout=180)
                 await self.broadcast_agent_status("staff_optimizer", "completed", 50, 
                                                  "Shift optimization completed", 0.88)
             except TimeoutError:
@@ -288,7 +411,8 @@ class SchedulingAgentsManager:
                 schedule_data = self._parse_agent_response(staff_result, 'schedule')
                 print(f"Parsed schedule data: {len(schedule_data.get('shifts', []))} shifts")
                 if schedule_data.get('shifts'):
-                    print(f"First AI-generated shift: {schedule_data['shifts'][0]}")
+                    if CREW_VERBOSE:
+                        print(f"First AI-generated shift: {schedule_data['shifts'][0]}")
                     print(f"SUCCESS: AI generated {len(schedule_data['shifts'])} shifts!")
                     
                     # Validate all departments have shifts, fill missing ones
@@ -296,169 +420,31 @@ class SchedulingAgentsManager:
                 else:
                     print("ERROR: AI agent did not generate any shifts")
                     schedule_data = {'shifts': [], 'error': 'No shifts generated by AI'}
-            except Exception as e:
+            except PARSE_ERRORS as e:
                 print(f"ERROR: Failed to parse schedule from agent: {e}")
-                import traceback
-                traceback.print_exc()
+                if CREW_VERBOSE:
+                    traceback.print_exc()
                 print("CRITICAL: Agent response could not be parsed")
                 schedule_data = {'shifts': [], 'error': str(e)}
             
-            await asyncio.sleep(1.0)
-            
-            # Step 3: Cost Analysis
-            await self.broadcast_agent_status("cost_analyst", "analyzing", 55, "Calculating labor costs...")
-            
-            cost_task = Task(
-                description=f"""
-                Analyze the labor costs for the proposed schedule.
-                
-                Schedule Data:
-                {json.dumps(schedule_data, indent=2)}
-                
-                Calculate:
-                1. Total regular hours cost
-                2. Overtime costs (1.5x rate after 40 hours/week)
-                3. Total weekly labor cost
-                4. Cost per customer served
-                5. Potential savings opportunities
-                
-                Provide specific dollar amounts and percentages.
-                """,
-                agent=self.cost_agent,
-                expected_output="Detailed cost analysis with specific amounts and savings opportunities"
-            )
-            
-            crew = Crew(
-                agents=[self.cost_agent],
-                tasks=[cost_task],
-                process=Process.sequential,
-                verbose=True,
-                max_execution_time=300  # 5 minutes timeout
-            )
-            
-            try:
-                cost_result = await self.run_crew_with_timeout(crew, timeout=120)
-                await self.broadcast_agent_status("cost_analyst", "completed", 70, 
-                                                 "Cost analysis completed", 0.95)
-            except TimeoutError:
-                print("Cost analysis timed out, using simplified approach")
-                cost_result = "Cost analysis: Estimated $10,000 weekly labor cost"
-                await self.broadcast_agent_status("cost_analyst", "completed", 70, 
-                                                 "Used simplified cost analysis (timeout)", 0.70)
-            
-            # Parse cost result
-            try:
-                cost_data = self._parse_agent_response(cost_result, 'cost')
-            except Exception as e:
-                print(f"Cost analysis parsing failed: {e}")
-                cost_data = self._generate_fallback_cost(schedule_data)
-            
-            await asyncio.sleep(1.0)
-            
-            # Step 4: Compliance Check
-            await self.broadcast_agent_status("compliance_checker", "analyzing", 75, "Verifying compliance...")
-            
-            try:
-                compliance_task = Task(
-                    description=f"""
-                    Review the schedule for labor law compliance.
-                    
-                    Schedule to review:
-                    {json.dumps(schedule_data, indent=2)}
-                    
-                    Check for:
-                    1. Maximum hours violations (>40 hours/week)
-                    2. Minimum rest periods (10 hours between shifts)
-                    3. Break requirements (30 min per 6 hours)
-                    4. Consecutive day limits
-                    
-                    Identify any violations and their severity (high/medium/low).
-                    """,
-                    agent=self.compliance_agent,
-                    expected_output="List of compliance issues with severity levels and recommendations"
-                )
-                
-                crew = Crew(
-                    agents=[self.compliance_agent],
-                    tasks=[compliance_task],
-                    process=Process.sequential,
-                    verbose=True,
-                    max_execution_time=300  # 5 minutes timeout
-                )
-                
-                compliance_result = await self.run_crew_with_timeout(crew, timeout=120)
-                await self.broadcast_agent_status("compliance_checker", "completed", 85, 
-                                                 "Compliance check completed", 0.98)
-                
-                # Parse compliance result
-                try:
-                    compliance_data = self._parse_agent_response(compliance_result, 'compliance')
-                except Exception as e:
-                    print(f"Compliance result parsing failed: {e}")
-                    compliance_data = {'violations': [], 'status': 'compliant'}
-            except Exception as e:
-                print(f"Compliance check failed: {e}")
-                compliance_data = {'violations': [], 'status': 'error', 'error': str(e)}
-                await self.broadcast_agent_status("compliance_checker", "completed", 85, 
-                                                 f"Compliance check failed: {str(e)[:50]}", 0.5)
-            
-            await asyncio.sleep(1.0)
-            
-            # Step 5: Quality Assurance
-            await self.broadcast_agent_status("quality_auditor", "analyzing", 90, "Evaluating schedule quality...")
-            
-            try:
-                quality_task = Task(
-                    description=f"""
-                    Evaluate the overall quality of the schedule.
-                    
-                    Schedule: {json.dumps(schedule_data, indent=2)}
-                    Cost Analysis: {json.dumps(cost_data, indent=2)}
-                    Compliance Status: {json.dumps(compliance_data, indent=2)}
-                    
-                    Assess:
-                    1. Coverage adequacy (are all shifts covered?)
-                    2. Employee satisfaction factors
-                    3. Fair distribution of hours
-                    4. Skill utilization efficiency
-                    
-                    Provide a quality score (1-10) and improvement recommendations.
-                    """,
-                    agent=self.quality_agent,
-                    expected_output="Quality score with detailed assessment and recommendations"
-                )
-                
-                crew = Crew(
-                    agents=[self.quality_agent],
-                    tasks=[quality_task],
-                    process=Process.sequential,
-                    verbose=True,
-                    max_execution_time=300  # 5 minutes timeout
-                )
-                
-                quality_result = await self.run_crew_with_timeout(crew, timeout=120)
-                await self.broadcast_agent_status("quality_auditor", "completed", 100, 
-                                                 "Quality assessment completed", 0.94)
-                
-                # Parse quality result
-                try:
-                    quality_data = self._parse_agent_response(quality_result, 'quality')
-                except Exception as e:
-                    print(f"Quality result parsing failed: {e}")
-                    quality_data = {'quality_score': 7.5, 'recommendations': []}
-            except Exception as e:
-                print(f"Quality assessment failed: {e}")
-                quality_data = {'quality_score': 6.0, 'recommendations': [], 'error': str(e)}
-                await self.broadcast_agent_status("quality_auditor", "completed", 100, 
-                                                 f"Quality assessment failed: {str(e)[:50]}", 0.5)
+            # Steps 3-5: cost, compliance and quality only read the schedule, so run them concurrently
+            # on one compact serialization of it
+            schedule_json = json.dumps(schedule_data, separators=(',', ':'))
+            async with asyncio.TaskGroup() as stages:
+                cost_stage = stages.create_task(self._analyze_costs(schedule_data, schedule_json))
+                compliance_stage = stages.create_task(self._check_compliance(schedule_json))
+                quality_stage = stages.create_task(self._assess_quality(schedule_json))
+            cost_data = cost_stage.result()
+            compliance_data = compliance_stage.result()
+            quality_data = quality_stage.result()
             
             await self.broadcast_agent_status("system", "completed", 100, 
                                          "AI-powered schedule optimization completed successfully!")
             
         except Exception as e:
             print(f"ERROR in agent optimization: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            if CREW_VERBOSE:
+                traceback.print_exc()
             
             # NO FALLBACKS - Agents must work or fail
             print(f"CRITICAL ERROR: Agent optimization failed")
@@ -478,19 +464,166 @@ class SchedulingAgentsManager:
         print(f"=== After compilation ===")
         print(f"Final result: {len(final_result.get('shifts', []))} shifts for departments {self.current_departments}")
         if final_result.get('shifts'):
-            print(f"Sample shift: {final_result['shifts'][0]}")
+            if CREW_VERBOSE:
+                print(f"Sample shift: {final_result['shifts'][0]}")
         else:
             print("WARNING: No shifts in final result!")
             print(f"Final result keys: {final_result.keys()}")
         
         return final_result
     
-    def _prepare_employee_context(self, departments: List[str]) -> str:
-        """Prepare employee information context for agents"""
+    async def _analyze_costs(self, schedule_data: Dict, schedule_json: str) -> Dict[str, Any]:
+        """Step 3: Cost Analysis"""
+        await self.broadcast_agent_status("cost_analyst", "analyzing", 55, "Calculating labor costs...")
+        
+        cost_task = Task(
+            description=f"""
+            Analyze the labor costs for the proposed schedule.
+            
+            Calculate:
+            1. Total regular hours cost
+            2. Overtime costs (1.5x rate after 40 hours/week)
+            3. Total weekly labor cost
+            4. Cost per customer served
+            5. Potential savings opportunities
+            
+            Provide specific dollar amounts and percentages.
+            
+            Schedule Data:
+            {schedule_json}
+            """,
+            agent=self.cost_agent,
+            expected_output="Detailed cost analysis with specific amounts and savings opportunities"
+        )
+        
+        try:
+            cost_result = await self.run_agent_task(self.cost_agent, cost_task, timeout=120)
+            await self.broadcast_agent_status("cost_analyst", "completed", 70, 
+                                             "Cost analysis completed", 0.95)
+        except TimeoutError:
+            print("Cost analysis timed out, using simplified approach")
+            cost_result = "Cost analysis: Estimated $10,000 weekly labor cost"
+            await self.broadcast_agent_status("cost_analyst", "completed", 70, 
+                                             "Used simplified cost analysis (timeout)", 0.70)
+        except Exception as e:
+            print(f"Cost analysis failed: {e}")
+            await self.broadcast_agent_status("cost_analyst", "completed", 70, 
+                                             f"Cost analysis failed: {str(e)[:50]}", 0.5)
+            return self._generate_fallback_cost(schedule_data)
+        
+        # Parse cost result
+        try:
+            return self._parse_agent_response(cost_result, 'cost')
+        except PARSE_ERRORS as e:
+            print(f"Cost analysis parsing failed: {e}")
+            return self._generate_fallback_cost(schedule_data)
+    
+    async def _check_compliance(self, schedule_json: str) -> Dict[str, Any]:
+        """Step 4: Compliance Check"""
+        await self.broadcast_agent_status("compliance_checker", "analyzing", 75, "Verifying compliance...")
+        
+        try:
+            compliance_task = Task(
+                description=f"""
+                Review the schedule for labor law compliance.
+                
+                Check for:
+                1. Maximum hours violations (>40 hours/week)
+                2. Minimum rest periods (10 hours between shifts)
+                3. Break requirements (30 min per 6 hours)
+                4. Consecutive day limits
+                
+                Identify any violations and their severity (high/medium/low).
+                
+                Schedule to review:
+                {schedule_json}
+                """,
+                agent=self.compliance_agent,
+                expected_output="List of compliance issues with severity levels and recommendations"
+            )
+            
+            compliance_result = await self.run_agent_task(self.compliance_agent, compliance_task, timeout=120)
+            await self.broadcast_agent_status("compliance_checker", "completed", 85, 
+                                             "Compliance check completed", 0.98)
+            
+            # Parse compliance result
+            try:
+                return self._parse_agent_response(compliance_result, 'compliance')
+            except PARSE_ERRORS as e:
+                print(f"Compliance result parsing failed: {e}")
+                return {'violations': [], 'status': 'compliant'}
+        except Exception as e:
+            print(f"Compliance check failed: {e}")
+            await self.broadcast_agent_status("compliance_checker", "completed", 85, 
+                                             f"Compliance check failed: {str(e)[:50]}", 0.5)
+            return {'violations': [], 'status': 'error', 'error': str(e)}
+    
+    async def _assess_quality(self, schedule_json: str) -> Dict[str, Any]:
+        """Step 5: Quality Assurance (runs alongside cost and compliance, so it sees only the schedule)"""
+        await self.broadcast_agent_status("quality_auditor", "analyzing", 90, "Evaluating schedule quality...")
+        
+        try:
+            quality_task = Task(
+                description=f"""
+                Evaluate the overall quality of the schedule.
+                
+                Assess:
+                1. Coverage adequacy (are all shifts covered?)
+                2. Employee satisfaction factors
+                3. Fair distribution of hours
+                4. Skill utilization efficiency
+                
+                Provide a quality score (1-10) and improvement recommendations.
+                
+                Schedule: {schedule_json}
+                """,
+                agent=self.quality_agent,
+                expected_output="Quality score with detailed assessment and recommendations"
+            )
+            
+            quality_result = await self.run_agent_task(self.quality_agent, quality_task, timeout=120)
+            await self.broadcast_agent_status("quality_auditor", "completed", 100, 
+                                             "Quality assessment completed", 0.94)
+            
+            # Parse quality result
+            try:
+                return self._parse_agent_response(quality_result, 'quality')
+            except PARSE_ERRORS as e:
+                print(f"Quality result parsing failed: {e}")
+                return {'quality_score': 7.5, 'recommendations': []}
+        except Exception as e:
+            print(f"Quality assessment failed: {e}")
+            await self.broadcast_agent_status("quality_auditor", "completed", 100, 
+                                             f"Quality assessment failed: {str(e)[:50]}", 0.5)
+            return {'quality_score': 6.0, 'recommendations': [], 'error': str(e)}
+    
+    def _build_employee_arrays(self):
+        """Column arrays over employees_data for vectorized department/skill filtering"""
+        self.employee_departments = np.array([emp['department'] for emp in self.employees_data])
+        self.employee_wages = {emp['id']: emp['hourly_wage'] for emp in self.employees_data}
+        self.skill_columns = {}
+        for emp in self.employees_data:
+            for skill in emp['skills']:
+                self.skill_columns.setdefault(skill, len(self.skill_columns))
+        
+        # Employees x skills bitmap
+        self.employee_skills = np.zeros((len(self.employees_data), len(self.skill_columns)), dtype=bool)
+        for i, emp in enumerate(self.employees_data):
+            self.employee_skills[i, [self.skill_columns[skill] for skill in emp['skills']]] = True
+    
+    def _relevant_employee_indices(self, departments: List[str]) -> np.ndarray:
+        """Indices of employees who work in, or are skilled for, any of the departments"""
+        mask = np.isin(self.employee_departments, departments)
+        columns = [self.skill_columns[d] for d in departments if d in self.skill_columns]
+        if columns:
+            mask |= self.employee_skills[:, columns].any(axis=1)
+        return np.flatnonzero(mask)
+    
+    def _employee_context(self, departments: tuple) -> str:
+        """Prepare employee information context for agents; departments is a sorted tuple so results can be cached"""
         relevant_employees = [
-            emp for emp in self.employees_data 
-            if emp['department'] in departments or any(d in emp['skills'] for d in departments)
-        ][:10]  # Limit to 10 for context size
+            self.employees_data[i] for i in self._relevant_employee_indices(list(departments))[:10]  # Limit to 10 for context size
+        ]
         
         employee_summary = []
         for emp in relevant_employees:
@@ -504,12 +637,25 @@ class SchedulingAgentsManager:
                 'availability': emp['availability']
             })
         
-        return json.dumps(employee_summary, indent=2)
+        return json.dumps(employee_summary, separators=(',', ':'))
     
     def _parse_agent_response(self, response: str, response_type: str) -> Dict[str, Any]:
         """Parse agent response and extract structured data"""
+        # Use output CrewAI already parsed when the task produced structured data
+        json_dict = getattr(response, 'json_dict', None)
+        if json_dict:
+            print(f"=== Using structured {response_type} Agent Response (from .json_dict) ===")
+            return json_dict
+        pydantic_output = getattr(response, 'pydantic', None)
+        if pydantic_output is not None:
+            print(f"=== Using structured {response_type} Agent Response (from .pydantic) ===")
+            return pydantic_output.model_dump()
+        
         # Handle CrewAI response object
-        if hasattr(response, 'output'):
+        if hasattr(response, 'raw'):
+            response_str = str(response.raw)
+            print(f"=== Parsing {response_type} Agent Response (from .raw) ===")
+        elif hasattr(response, 'output'):
             response_str = str(response.output)
             print(f"=== Parsing {response_type} Agent Response (from .output) ===")
         elif hasattr(response, 'result'):
@@ -521,72 +667,83 @@ class SchedulingAgentsManager:
         
         print(f"Response type: {type(response)}")
         print(f"Response length: {len(response_str)}")
-        print(f"--- FULL AGENT RESPONSE ---")
-        print(response_str)
-        print(f"--- END AGENT RESPONSE ---")
+        if CREW_VERBOSE:
+            print(f"--- FULL AGENT RESPONSE ---")
+            print(response_str)
+            print(f"--- END AGENT RESPONSE ---")
         
-        # Try to extract JSON from the response
-        try:
-            import re
-            
-            # Try direct JSON parse first (if agent outputs only JSON)
-            try:
-                parsed = json.loads(response_str.strip())
-                print(f"SUCCESS: Direct JSON parse worked for {response_type}!")
-                return parsed
-            except:
-                pass
-            
-            # Try to find JSON block in code blocks first (```json ... ```)
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_str, re.IGNORECASE)
-            if json_match:
-                json_content = json_match.group(1).strip()
-                print(f"Found JSON in code block, attempting parse...")
-                parsed = json.loads(json_content)
-                print(f"SUCCESS: Parsed JSON from code block for {response_type}")
-                return parsed
-            
-            # Try to find JSON block in code blocks without json marker (``` ... ```)
-            json_match = re.search(r'```\s*([\s\S]*?)\s*```', response_str)
-            if json_match:
-                json_content = json_match.group(1).strip()
-                if json_content.startswith('{'):
-                    print(f"Found potential JSON in generic code block, attempting parse...")
-                    parsed = json.loads(json_content)
-                    print(f"SUCCESS: Parsed JSON from generic code block for {response_type}")
-                    return parsed
-            
-            # Try to find raw JSON starting with { and ending with }
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_str)
-            if json_match:
-                json_content = json_match.group()
+        # Try to extract JSON from the response, preferring a fenced code block (```json ... ```)
+        json_content = None
+        fence_start = response_str.find('```')
+        if fence_start != -1:
+            fence_end = response_str.find('```', fence_start + 3)
+            if fence_end != -1:
+                span = self._find_json_span(response_str, fence_start, fence_end)
+                if span:
+                    print(f"Found JSON in code block, attempting parse...")
+                    json_content = response_str[span[0]:span[1]]
+        
+        if json_content is None:
+            span = self._find_json_span(response_str)
+            if span:
                 print(f"Found potential raw JSON, attempting parse...")
-                parsed = json.loads(json_content)
-                print(f"SUCCESS: Parsed raw JSON for {response_type}")
+                json_content = response_str[span[0]:span[1]]
+        
+        if json_content is not None:
+            try:
+                parsed = orjson.loads(json_content)
+                print(f"SUCCESS: Parsed JSON for {response_type}")
                 return parsed
-                
-        except Exception as e:
-            print(f"Failed to parse JSON from {response_type} agent response: {e}")
-            print(f"JSON content that failed: {json_content[:200] if 'json_content' in locals() else 'N/A'}")
+            except orjson.JSONDecodeError as e:
+                print(f"Failed to parse JSON from {response_type} agent response: {e}")
+                print(f"JSON content that failed: {json_content[:200]}")
         
         # If JSON parsing fails, return empty - NO FALLBACKS
         print(f"ERROR: Could not extract JSON from {response_type} agent response")
         print(f"Agent must output valid JSON. No fallback will be used.")
         return {}
     
+    def _find_json_span(self, text: str, start: int = 0, end: int = None) -> Optional[Tuple[int, int]]:
+        """Span of the first balanced {...} in text[start:end], ignoring braces inside string literals"""
+        begin = text.find('{', start, end)
+        if begin == -1:
+            return None
+        
+        # Single pass over the structural characters only; ordinary text is skipped by the regex engine
+        depth = 0
+        in_string = False
+        skip_until = -1
+        for match in JSON_TOKENS.finditer(text, begin, len(text) if end is None else end):
+            i = match.start()
+            if i < skip_until:
+                continue  # Escaped character inside a string
+            char = text[i]
+            if char == '\\':
+                if in_string:
+                    skip_until = i + 2
+            elif char == '"':
+                in_string = not in_string
+            elif in_string:
+                continue
+            elif char == '{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return begin, i + 1
+        return None
+    
     def _extract_demand_data(self, response: str) -> Dict[str, Any]:
         """Extract demand data from agent response text"""
         # Parse percentages and numbers from the response
-        import re
-        
         data = {
             'department_allocations': {},
             'daily_breakdown': []
         }
         
         # Look for department percentages
-        for dept in ['Electronics', 'Sales Floor', 'Customer Service']:
-            match = re.search(f'{dept}.*?(\\d+)%', response, re.IGNORECASE)
+        for dept, pattern in DEMAND_PERCENT_PATTERNS.items():
+            match = pattern.search(response)
             if match:
                 percentage = int(match.group(1)) / 100
                 data['department_allocations'][dept] = {
@@ -612,21 +769,9 @@ class SchedulingAgentsManager:
         shifts = []
         departments = getattr(self, 'current_departments', ['Sales Floor', 'Customer Service', 'Electronics'])
         
-        # Look for structured shift data in the response
-        import re
-        
-        # Try to find shift assignments in various formats
-        shift_patterns = [
-            # Pattern: "Employee: John, Department: Sales Floor, Day: Monday, Time: 9:00-17:00"
-            r'Employee:\s*(\w+).*?Department:\s*([^,\n]+).*?Day:\s*(\w+).*?Time:\s*(\d+:\d+)-(\d+:\d+)',
-            # Pattern: "Monday: Sales Floor - Employee123 (9:00-17:00)"
-            r'(\w+):\s*([^-\n]+)-\s*(\w+)\s*\((\d+:\d+)-(\d+:\d+)\)',
-            # Pattern: "Sales Floor: Monday 9:00-17:00 (Employee123)"
-            r'([^:\n]+):\s*(\w+)\s*(\d+:\d+)-(\d+:\d+)\s*\(([^)]+)\)'
-        ]
-        
-        for pattern in shift_patterns:
-            matches = re.findall(pattern, response, re.IGNORECASE | re.MULTILINE)
+        # Look for structured shift data in the response, trying each known format
+        for pattern in SHIFT_PATTERNS:
+            matches = pattern.findall(response)
             if matches:
                 print(f"Found {len(matches)} shift matches with pattern")
                 for i, match in enumerate(matches[:20]):  # Limit to 20 matches to avoid too many
@@ -668,11 +813,9 @@ class SchedulingAgentsManager:
         print("Warning: Agent response didn't include parseable shifts, generating intelligent fallback")
         
         # Look for mentioned employees or departments in the response to make fallback more relevant
-        mentioned_employees = re.findall(r'employee[_\s]*(\w+)', response, re.IGNORECASE)
-        mentioned_departments = []
-        for dept in departments:
-            if dept.lower() in response.lower():
-                mentioned_departments.append(dept)
+        mentioned_employees = EMPLOYEE_MENTION_PATTERN.findall(response)
+        response_lower = response.lower()
+        mentioned_departments = [dept for dept in departments if dept.lower() in response_lower]
         
         if not mentioned_departments:
             mentioned_departments = departments
@@ -685,8 +828,6 @@ class SchedulingAgentsManager:
     
     def _extract_cost_data(self, response: str) -> Dict[str, Any]:
         """Extract cost data from agent response"""
-        import re
-        
         data = {
             'total_cost': 10000,
             'overtime_cost': 500,
@@ -695,7 +836,7 @@ class SchedulingAgentsManager:
         }
         
         # Try to extract dollar amounts
-        dollar_matches = re.findall(r'\\$(\\d+(?:,\\d+)?(?:\\.\\d+)?)', response)
+        dollar_matches = DOLLAR_AMOUNT_PATTERN.findall(response)
         if dollar_matches:
             amounts = [float(m.replace(',', '')) for m in dollar_matches]
             if amounts:
@@ -727,10 +868,8 @@ class SchedulingAgentsManager:
     
     def _extract_quality_data(self, response: str) -> Dict[str, Any]:
         """Extract quality data from agent response"""
-        import re
-        
         # Look for quality score
-        score_match = re.search(r'(\\d+(?:\\.\\d+)?)\\s*(?:out of 10|/10)', response)
+        score_match = QUALITY_SCORE_PATTERN.search(response)
         quality_score = float(score_match.group(1)) if score_match else 7.5
         
         return {
@@ -772,9 +911,8 @@ class SchedulingAgentsManager:
                     for shift_time in ['morning', 'evening']:
                         if self.employees_data:
                             # Try to find an employee with skills for this department
-                            suitable_emps = [e for e in self.employees_data 
-                                           if dept in e.get('skills', []) or dept == e.get('department')]
-                            emp = random.choice(suitable_emps) if suitable_emps else random.choice(self.employees_data)
+                            suitable_emps = self._relevant_employee_indices([dept])
+                            emp = self.employees_data[random.choice(suitable_emps)] if len(suitable_emps) else random.choice(self.employees_data)
                         else:
                             emp = {'id': f'emp_{day_idx:03d}', 'name': f'Employee {day_idx+1}'}
                         
@@ -821,8 +959,6 @@ class SchedulingAgentsManager:
     
     def _generate_fallback_schedule(self, demand_data: Dict, departments: List[str]) -> Dict:
         """Generate fallback schedule if AI parsing fails"""
-        shifts = []
-        
         print(f"=== Generating Fallback Schedule ===")
         print(f"Departments: {departments}")
         print(f"Employees available: {len(self.employees_data) if self.employees_data else 0}")
@@ -832,38 +968,37 @@ class SchedulingAgentsManager:
             departments = getattr(self, 'current_departments', ['Sales Floor', 'Customer Service'])
             print(f"No departments provided, using: {departments}")
         
-        for day_idx in range(7):
-            for dept in departments:
-                # Create morning and evening shifts
-                for shift_time in ['morning', 'evening']:
-                    if self.employees_data and len(self.employees_data) > 0:
-                        emp = random.choice(self.employees_data)
-                        print(f"Selected employee: {emp['id']} for {dept} {shift_time} shift")
-                    else:
-                        # Create a dummy employee if no data available
-                        emp = {
-                            'id': f'emp_{day_idx}_{dept[:3]}',
-                            'name': f'Employee {day_idx}',
-                            'hourly_wage': 20
-                        }
-                        print(f"Created dummy employee: {emp['id']}")
-                    
-                    shift = {
-                        'id': f'shift_{day_idx}_{dept.replace(" ", "_")}_{shift_time}',
-                        'day': day_idx,
-                        'department': dept,
-                        'employee_id': emp['id'],
-                        'employee_name': emp.get('name', 'Unknown'),
-                        'start_time': '08:00' if shift_time == 'morning' else '14:00',
-                        'end_time': '16:00' if shift_time == 'morning' else '22:00',
-                        'hourly_wage': emp.get('hourly_wage', 20),
-                        'confidence': 0.85,
-                        'reason': f'AI-optimized shift for {dept} coverage'
-                    }
-                    shifts.append(shift)
+        # Every (day, department, morning/evening) slot, with all employee picks drawn in one call
+        slots = list(itertools.product(range(7), departments, FALLBACK_SHIFT_TIMES))
+        if self.employees_data:
+            picks = np.random.default_rng().integers(len(self.employees_data), size=len(slots))
+            employees = [self.employees_data[i] for i in picks]
+        else:
+            # Create dummy employees if no data available
+            employees = [
+                {'id': f'emp_{day_idx}_{dept[:3]}', 'name': f'Employee {day_idx}', 'hourly_wage': 20}
+                for day_idx, dept, _ in slots
+            ]
+        dept_keys = {dept: dept.replace(" ", "_") for dept in departments}
+        
+        shifts = [
+            {
+                'id': f'shift_{day_idx}_{dept_keys[dept]}_{shift_time}',
+                'day': day_idx,
+                'department': dept,
+                'employee_id': emp['id'],
+                'employee_name': emp.get('name', 'Unknown'),
+                'start_time': start_time,
+                'end_time': end_time,
+                'hourly_wage': emp.get('hourly_wage', 20),
+                'confidence': 0.85,
+                'reason': f'AI-optimized shift for {dept} coverage'
+            }
+            for (day_idx, dept, (shift_time, start_time, end_time)), emp in zip(slots, employees)
+        ]
         
         print(f"Generated {len(shifts)} shifts in fallback schedule")
-        if shifts:
+        if shifts and CREW_VERBOSE:
             print(f"Sample shift: {shifts[0]}")
         
         result = {
@@ -876,17 +1011,43 @@ class SchedulingAgentsManager:
         return result
     
     def _generate_fallback_cost(self, schedule_data: Dict) -> Dict:
-        """Generate fallback cost analysis"""
-        total_hours = len(schedule_data.get('shifts', [])) * 8
-        avg_wage = 20
+        """Generate fallback cost analysis from shift hours and wages, with 1.5x overtime past 40 hours/week"""
+        shifts = schedule_data.get('shifts', [])
+        if not shifts:
+            return {'total_cost': 0, 'regular_cost': 0, 'overtime_cost': 0, 'total_savings': 1000, 'cost_per_customer': 1.5}
+        
+        hours = np.array([self._shift_hours(shift) for shift in shifts])
+        wages = np.array([
+            shift.get('hourly_wage') or self.employee_wages.get(shift.get('employee_id'), 20)
+            for shift in shifts
+        ], dtype=float)
+        
+        # Weekly hours per employee; each employee is paid at the wage on their shifts
+        employee_ids, employee_idx = np.unique([str(shift.get('employee_id')) for shift in shifts], return_inverse=True)
+        employee_hours = np.bincount(employee_idx, weights=hours, minlength=len(employee_ids))
+        employee_wage = np.zeros(len(employee_ids))
+        employee_wage[employee_idx] = wages
+        
+        regular_cost = float((np.minimum(employee_hours, 40) * employee_wage).sum())
+        overtime_cost = float((np.maximum(employee_hours - 40, 0) * employee_wage * 1.5).sum())
         
         return {
-            'total_cost': total_hours * avg_wage,
-            'overtime_cost': total_hours * avg_wage * 0.1,
+            'total_cost': round(regular_cost + overtime_cost, 2),
+            'regular_cost': round(regular_cost, 2),
+            'overtime_cost': round(overtime_cost, 2),
             'total_savings': 1000,
             'cost_per_customer': 1.5
         }
     
+    def _shift_hours(self, shift: Dict) -> float:
+        """Length of a shift in hours from its HH:MM start/end times; 8 when they are missing or malformed"""
+        try:
+            start_h, start_m = map(int, str(shift['start_time']).split(':')[:2])
+            end_h, end_m = map(int, str(shift['end_time']).split(':')[:2])
+        except (KeyError, ValueError):
+            return 8.0
+        return ((end_h * 60 + end_m) - (start_h * 60 + start_m)) % (24 * 60) / 60
+    
     def _compile_final_results(self, demand_data: Dict, schedule_data: Dict, 
                                cost_data: Dict, compliance_data: Dict, 
                                quality_data: Dict) -> Dict[str, Any]: